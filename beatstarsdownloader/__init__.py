@@ -1 +1,12 @@
+from .api import (  # noqa: F401
+    Catalog,
+    DownloadOptions,
+    Progress,
+    RunReport,
+    Track,
+    TrackOutcome,
+    download,
+    fetch_catalog,
+)
 from .config import __version__  # noqa: F401
+from .pipeline import PipelineConfig  # noqa: F401
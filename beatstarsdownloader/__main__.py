@@ -2,6 +2,7 @@ import argparse
 import datetime
 import os
 import sys
+from dataclasses import replace
 from pathlib import Path
 from typing import Optional
 
@@ -11,8 +12,13 @@ from rich.panel import Panel
 from rich.text import Text
 
 import beatstarsdownloader.url_helpers as helpers
+from beatstarsdownloader.api import Catalog, DownloadOptions
 from beatstarsdownloader.beatstarsdownloader import BeatStarsDownloader
 from beatstarsdownloader.config import __title__, __version__
+from beatstarsdownloader.logger import debug_logger
+from beatstarsdownloader.pipeline import PipelineConfig
+from beatstarsdownloader.profiling import Profiler, default_profile_prefix
+from beatstarsdownloader.report import RunReport, TrackOutcome, default_report_path
 
 console = Console()
 
@@ -78,7 +84,15 @@ def show_main_menu() -> bool:
     return bool(choice == "Download an artist's tracks")
 
 
-def cli() -> tuple[str, Optional[str], bool, str, Optional[bool]]:
+def cli() -> tuple[
+    str,
+    DownloadOptions,
+    Optional[bool],
+    Optional[str],
+    Optional[str],
+    Optional[str],
+    bool,
+]:
     parser = argparse.ArgumentParser(
         description="Tool for downloading BeatStars tracks."
     )
@@ -117,6 +131,67 @@ def cli() -> tuple[str, Optional[str], bool, str, Optional[bool]]:
         action="store_true",
         help="Allows you to interactively select tracks to download",
     )
+    parser.add_argument(
+        "--report",
+        dest="report",
+        default=None,
+        type=str,
+        help="Where to write the JSON run report. "
+        "default: <dir>/.beatstarsdownloader/reports/report-<timestamp>.json",
+    )
+    parser.add_argument(
+        "--replay",
+        dest="replay",
+        default=None,
+        type=str,
+        help="Re-attempt only the failed tracks from a previous run report, "
+        "saving them under -d if given, else where the original run saved them",
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        default=False,
+        action="store_true",
+        help="Profile the run and write .pstats and .collapsed (flame graph) "
+        "files to <dir>/.beatstarsdownloader/profiles/profile-<timestamp>",
+    )
+    parser.add_argument(
+        "--profile-out",
+        dest="profile_out",
+        default=None,
+        type=str,
+        help="Path prefix for the profile files, implies --profile",
+    )
+    parser.add_argument(
+        "--trust-index",
+        dest="trust_index",
+        default=False,
+        action="store_true",
+        help="Use the saved index of downloaded tracks instead of listing the "
+        "output folder",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        default=PipelineConfig.fetch_workers,
+        type=int,
+        help="Number of tracks to download at the same time",
+    )
+    parser.add_argument(
+        "--transcode-workers",
+        dest="transcode_workers",
+        default=PipelineConfig.transcode_workers,
+        type=int,
+        help="Number of non-mp3 tracks to convert with ffmpeg at the same time",
+    )
+    parser.add_argument(
+        "--max-buffer-mb",
+        dest="max_buffer_mb",
+        default=PipelineConfig.max_inflight_bytes // (1024 * 1024),
+        type=int,
+        help="Maximum MB of audio held in memory across all downloads",
+    )
 
     if sys.argv[1:]:
         args = parser.parse_args(args=sys.argv[1:])
@@ -126,11 +201,29 @@ def cli() -> tuple[str, Optional[str], bool, str, Optional[bool]]:
         else:
             output_dir = args.directory
         # define where to save mp3s
-        album = args.album
-        overwrite = args.overwrite
-        url = args.url
-        track_select = args.track_select
-        return output_dir, album, overwrite, url, track_select
+        options = DownloadOptions(
+            output_dir=output_dir,
+            overwrite=args.overwrite,
+            album=args.album,
+            trust_index=args.trust_index,
+            pipeline=PipelineConfig(
+                fetch_workers=args.workers,
+                transcode_workers=args.transcode_workers,
+                max_inflight_bytes=args.max_buffer_mb * 1024 * 1024,
+            ),
+        )
+        profile_prefix = None
+        if args.profile or args.profile_out:
+            profile_prefix = args.profile_out or default_profile_prefix(output_dir)
+        return (
+            args.url,
+            options,
+            args.track_select,
+            args.replay,
+            args.report,
+            profile_prefix,
+            bool(args.directory),
+        )
     else:
         show_welcome_screen()
 
@@ -173,30 +266,138 @@ def cli() -> tuple[str, Optional[str], bool, str, Optional[bool]]:
             style=QUESTIONARY_STYLE,
         ).ask()
 
-        return output_dir, album, overwrite, url, track_select
+        options = DownloadOptions(
+            output_dir=output_dir, overwrite=overwrite, album=album
+        )
+        return url, options, track_select, None, None, None, False
 
 
-def run() -> None:
-    output_dir, album, overwrite, url, track_select = cli()
-
-    if helpers.is_local(url):
-        try:
-            if url.endswith(".txt"):
-                with open(url) as f:
-                    lines = f.readlines()
-                    lines = list(set(lines))
-                    for line in lines:
-                        try:
-                            BeatStarsDownloader(
-                                line.strip(), output_dir
-                            ).download_tracks(overwrite, album, track_select)
-                        except Exception as e:
-                            print(e)
-            else:
-                raise Exception("Please supply a txt file")
-        except Exception as e:
-            print(e)
-    else:
-        BeatStarsDownloader(url, output_dir).download_tracks(
-            overwrite, album, track_select
+def download_artist(
+    url: str,
+    options: DownloadOptions,
+    track_select: Optional[bool],
+    report: RunReport,
+    catalog: Optional[Catalog] = None,
+) -> None:
+    """Download one artist page with the terminal UI."""
+    BeatStarsDownloader(url, options.output_dir, catalog).download_tracks(
+        options.overwrite,
+        options.album,
+        track_select,
+        options.pipeline,
+        options.trust_index,
+        report,
+    )
+
+
+def replay(
+    report_path: str,
+    options: DownloadOptions,
+    report: RunReport,
+    rebase: bool = False,
+) -> None:
+    """
+    Re-attempt the failed entries of a previous run report.
+
+    Failed tracks are downloaded straight from their recorded URLs without
+    scraping the artist page again; artist pages that failed to load are
+    scraped from scratch. Tracks go back to the artist folders recorded in
+    the report, or with `rebase` to the same artist folders under
+    options.output_dir.
+    """
+    failed = RunReport.load(report_path).failed()
+    print(f"Replaying {len(failed)} failed entries from {report_path}")
+
+    by_artist: dict[str, list[TrackOutcome]] = {}
+    for outcome in failed:
+        if outcome.kind == "page":
+            try:
+                download_artist(outcome.url, options, None, report)
+            except Exception as e:
+                report.add_page_failure(outcome.url, e)
+                print(e)
+        else:
+            by_artist.setdefault(os.path.dirname(outcome.path), []).append(outcome)
+
+    for dir_path, outcomes in by_artist.items():
+        output_dir = options.output_dir if rebase else os.path.dirname(dir_path)
+        artist_options = replace(
+            options,
+            output_dir=output_dir,
+            album=options.album or outcomes[0].album,
+        )
+        download_artist(
+            "", artist_options, None, report, Catalog.from_outcomes(outcomes)
         )
+
+
+def download_all(
+    url: str,
+    options: DownloadOptions,
+    track_select: Optional[bool],
+    replay_path: Optional[str],
+    report_path: Optional[str],
+    rebase: bool = False,
+) -> None:
+    """Download a url, a txt file of urls or a replay, and write the report."""
+    report = RunReport()
+    report_path = report_path or default_report_path(options.output_dir)
+
+    try:
+        if replay_path:
+            replay(replay_path, options, report, rebase)
+        elif helpers.is_local(url):
+            try:
+                if url.endswith(".txt"):
+                    with open(url) as f:
+                        lines = f.readlines()
+                        lines = list(set(lines))
+                        for line in lines:
+                            try:
+                                download_artist(
+                                    line.strip(), options, track_select, report
+                                )
+                            except Exception as e:
+                                report.add_page_failure(line.strip(), e)
+                                print(e)
+                else:
+                    raise Exception("Please supply a txt file")
+            except Exception as e:
+                print(e)
+        else:
+            try:
+                download_artist(url, options, track_select, report)
+            except Exception as e:
+                report.add_page_failure(url, e)
+                raise
+    finally:
+        report.save(report_path)
+        summary = ", ".join(f"{n} {status}" for status, n in report.summary().items())
+        print(f"Report saved to {report_path} ({summary or 'nothing to do'})")
+
+
+def run() -> None:
+    (
+        url,
+        options,
+        track_select,
+        replay_path,
+        report_path,
+        profile_prefix,
+        rebase,
+    ) = cli()
+    debug_logger.enable_terminal_output()
+    if profile_prefix is None:
+        download_all(url, options, track_select, replay_path, report_path, rebase)
+        return
+
+    profiler = Profiler(profile_prefix)
+    try:
+        with profiler:
+            download_all(url, options, track_select, replay_path, report_path, rebase)
+    finally:
+        print(f"Profile saved to {profiler.pstats_path} and {profiler.collapsed_path}")
+        for name, seconds in sorted(
+            profiler.phase_times.items(), key=lambda item: -item[1]
+        ):
+            print(f"  {name}: {seconds:.2f}s")
@@ -0,0 +1,473 @@
+"""
+Library API for downloading BeatStars tracks without the terminal UI.
+
+    from beatstarsdownloader import DownloadOptions, download, fetch_catalog
+
+    catalog = fetch_catalog("lovbug")
+    report = download(catalog, DownloadOptions(output_dir="/music"))
+
+Nothing here prints; progress is reported through `on_progress` callbacks
+and errors are logged at DEBUG level to the `beatstarsdownloader` logger.
+"""
+
+import os
+import threading
+import time
+import warnings
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Callable, Optional
+from urllib.error import HTTPError
+
+from mutagen.id3 import APIC, ID3, TALB, TIT2, TPE1
+from mutagen.mp3 import MP3, HeaderNotFoundError
+from PIL import Image as PILImage
+
+# Suppress pydub ffmpeg warning
+warnings.filterwarnings("ignore", "Couldn't find ffmpeg or avconv", RuntimeWarning)
+from pydub import AudioSegment  # type: ignore  # noqa: E402
+
+import beatstarsdownloader.url_helpers as helpers  # noqa: E402
+from beatstarsdownloader.artwork import ArtworkResolver  # noqa: E402
+from beatstarsdownloader.catalog import Catalog, Track, fetch_catalog  # noqa: E402
+from beatstarsdownloader.logger import debug_logger  # noqa: E402
+from beatstarsdownloader.normalize import unique_filenames  # noqa: E402
+from beatstarsdownloader.output_index import OutputIndex  # noqa: E402
+from beatstarsdownloader.pipeline import (  # noqa: E402
+    BudgetClosed,
+    ByteBudget,
+    Pipeline,
+    PipelineConfig,
+    Stage,
+    check_executor,
+)
+from beatstarsdownloader.profiling import phase  # noqa: E402
+from beatstarsdownloader.report import RunReport, TrackOutcome  # noqa: E402
+from beatstarsdownloader.sniff import (  # noqa: E402
+    REJECT,
+    SNIFF_SIZE,
+    TRANSCODE,
+    sniff_audio,
+)
+
+# Bytes read at a time from responses without a Content-Length
+READ_CHUNK = 256 * 1024
+
+__all__ = [
+    "Catalog",
+    "DownloadOptions",
+    "Progress",
+    "RunReport",
+    "Track",
+    "TrackOutcome",
+    "download",
+    "fetch_catalog",
+]
+
+
+@dataclass
+class DownloadOptions:
+    """Where and how to save the tracks of a catalog."""
+
+    output_dir: str
+    overwrite: bool = False
+    album: Optional[str] = None
+    trust_index: bool = False
+    pipeline: PipelineConfig = field(default_factory=PipelineConfig)
+
+
+@dataclass
+class Progress:
+    """Passed to `on_progress` each time a track finishes or is skipped."""
+
+    outcome: TrackOutcome
+    done: int
+    total: int
+    queue_depths: dict[str, int]
+    buffered_bytes: int
+
+
+@dataclass
+class TrackJob:
+    """A single track moving through the download pipeline."""
+
+    index: int
+    number: int
+    total: int
+    name: str
+    url: str
+    path: str
+    content: Optional[bytes] = None
+    mp3: Optional[MP3] = None
+    album_art: Optional[bytes] = None
+    reserved: int = 0
+    status: str = "pending"
+    message: str = ""
+    error: Optional[str] = None
+    bytes: int = 0
+    started: float = 0.0
+
+    def fail(self, message: str, error: str) -> None:
+        self.status = "failed"
+        self.message = message
+        self.error = error
+
+
+class _Download:
+    """State shared by the pipeline stages while one catalog downloads."""
+
+    def __init__(self, catalog: Catalog, options: DownloadOptions):
+        self.catalog = catalog
+        self.options = options
+        self.artist_name = catalog.artist_name
+        self.artwork = [track.artwork_url for track in catalog.tracks]
+        self.dir_path = f"{options.output_dir}/{catalog.artist_name}"
+        self.budget = ByteBudget(options.pipeline.max_inflight_bytes)
+        self.index = OutputIndex(self.dir_path, trust=options.trust_index)
+        # remembers dead artwork URLs for the whole download
+        self.artwork_resolver = ArtworkResolver(races=options.pipeline.artwork_workers)
+
+    def _fetch_stage(self, job: TrackJob) -> Optional[str]:
+        """
+        Pipeline stage: download the track audio within the byte budget.
+
+        :param job: TrackJob
+            track to download
+        :return: Optional[str]
+            next stage name, or None if the track is finished
+        """
+        job.started = time.monotonic()
+        try:
+            response = helpers.open_stream(job.url)
+        except HTTPError as e:
+            debug_logger.debug_error(
+                f"BeatStars error for track {job.number}/{job.total}: "
+                f"{job.name} - No content returned from URL: {job.url}"
+            )
+            job.fail(
+                f"{job.number} BeatStars error skipping {job.name} ({e})",
+                type(e).__name__,
+            )
+            return None
+        # Decide what to do from the first few KB before reading the body
+        head = response.read(SNIFF_SIZE)
+        handler, detected = sniff_audio(head, response.headers.get("Content-Type"))
+        if handler == REJECT:
+            response.close()
+            job.bytes = len(head)
+            if not head:
+                debug_logger.debug_error(
+                    f"BeatStars error for track {job.number}/{job.total}: "
+                    f"{job.name} - No content returned from URL: {job.url}"
+                )
+                job.fail(
+                    f"{job.number} BeatStars error skipping {job.name}",
+                    "EmptyResponse",
+                )
+                return None
+            debug_logger.debug_error(
+                f"Unsupported content for track {job.number}/{job.total}: "
+                f"{job.name} - {detected} - URL: {job.url}"
+            )
+            job.fail(
+                f"{job.number} Not audio ({detected}) skipping {job.name}",
+                "UnsupportedContent",
+            )
+            return None
+
+        size = int(response.headers.get("Content-Length") or 0)
+        with phase("body"):
+            if size:
+                job.reserved = self.budget.acquire(size, owner=job)
+                content = head + response.read()
+            else:
+                content = self._read_unsized(job, response, head)
+        job.bytes = len(content)
+        job.content = content
+        if handler == TRANSCODE:
+            return "transcode"
+        try:
+            job.mp3 = MP3(BytesIO(content))
+        except HeaderNotFoundError as e:
+            # not an mp3 mutagen can read, let ffmpeg try
+            debug_logger.debug_track_download_error(
+                track_name=job.name,
+                track_number=job.number,
+                total_tracks=job.total,
+                error=e,
+                url=job.url,
+            )
+            return "transcode"
+        return "artwork"
+
+    def _read_unsized(self, job: TrackJob, response: Any, head: bytes) -> bytes:
+        """
+        Read a body without Content-Length, reserving budget before each chunk.
+
+        When the budget runs out mid-read, one track at a time may take the
+        budget's overdraft and finish reading past the limit.
+        """
+        job.reserved = self.budget.acquire(len(head), owner=job)
+        chunks = [head]
+        try:
+            while True:
+                job.reserved += self.budget.acquire(READ_CHUNK, owner=job)
+                chunk = response.read(READ_CHUNK)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        except BudgetClosed:
+            response.close()
+            raise
+        content = b"".join(chunks)
+        # give back what the last, short chunk did not use
+        unused = job.reserved - len(content)
+        if unused > 0:
+            self.budget.release(unused, owner=job)
+            job.reserved -= unused
+        return content
+
+    @staticmethod
+    def _transcode_stage(job: TrackJob) -> Optional[str]:
+        """Pipeline stage: convert non-mp3 audio to mp3 with pydub/ffmpeg."""
+        assert job.content is not None
+        with phase("pydub"):
+            segment = AudioSegment.from_file(BytesIO(job.content))
+            exported = segment.export(format="mp3")
+        job.content = exported.read()
+        job.mp3 = MP3(BytesIO(job.content))
+        return "artwork"
+
+    def _artwork_stage(self, job: TrackJob) -> Optional[str]:
+        """Pipeline stage: fetch the cover and convert it to PNG."""
+        with phase("download"):
+            album_art = self.artwork_resolver.resolve(self.artwork, job.index)
+        if album_art is None:
+            debug_logger.debug_error(
+                f"Artwork download failed for track "
+                f"{job.number}/{job.total}: {job.name} - "
+                f"URL: {self.artwork[job.index]}"
+            )
+        else:
+            # Convert image to PNG for compatibility
+            with phase("pil"):
+                pil_img = PILImage.open(BytesIO(album_art))
+                img_byte_arr = BytesIO()
+                pil_img.save(img_byte_arr, format="PNG")
+            job.album_art = img_byte_arr.getvalue()
+        return "write"
+
+    def _write_stage(self, job: TrackJob) -> Optional[str]:
+        """Pipeline stage: set ID3 tags and write the track to disk."""
+        mp3 = job.mp3
+        assert mp3 is not None and job.content is not None
+        if mp3.tags is None:
+            mp3.tags = ID3()  # type: ignore
+        # ID3 Frames:
+        # https://mutagen.readthedocs.io/en/latest/api
+        # /id3_frames.html
+        # #id3v2-3-4-frames
+        if mp3.tags is not None:
+            mp3.tags["TPE1"] = TPE1(encoding=3, text=self.artist_name)
+            mp3.tags["TIT2"] = TIT2(encoding=3, text=job.name)
+            if job.album_art:
+                mp3.tags["APIC"] = APIC(
+                    encoding=3,
+                    mime="image/jpeg",
+                    type=3,
+                    desc="Cover",
+                    data=job.album_art,
+                )
+            if self.options.album:
+                mp3.tags["TALB"] = TALB(encoding=3, text=self.options.album)
+        # Save mp3 then save metadata
+        with phase("disk"):
+            with open(job.path, "wb") as f:
+                f.write(job.content)
+            mp3.save(job.path)
+        self.index.add(os.path.basename(job.path))
+        job.status = "saved"
+        return None
+
+    @staticmethod
+    def _stage_error(job: TrackJob, error: Exception) -> None:
+        """Record an unexpected stage failure on the job."""
+        debug_logger.debug_track_download_error(
+            track_name=job.name,
+            track_number=job.number,
+            total_tracks=job.total,
+            error=error,
+            url=job.url,
+        )
+        job.fail(
+            f"{job.number} ERROR: {error} skipping {job.name}", type(error).__name__
+        )
+
+    @staticmethod
+    def _stage_cancel(job: TrackJob) -> None:
+        job.status = "cancelled"
+        job.message = f"{job.number} Cancelled {job.name}"
+
+    def _build_pipeline(
+        self,
+        cancel: Optional[threading.Event],
+        executor: Optional[Executor],
+        executor_threads: Optional[int],
+    ) -> Pipeline:
+        """Wire up the fetch -> transcode -> artwork -> write stages."""
+        config = self.options.pipeline
+        return Pipeline(
+            [
+                Stage(
+                    "fetch", self._fetch_stage, config.fetch_workers, config.queue_size
+                ),
+                Stage(
+                    "transcode",
+                    self._transcode_stage,
+                    config.transcode_workers,
+                    config.queue_size,
+                ),
+                Stage(
+                    "artwork",
+                    self._artwork_stage,
+                    config.artwork_workers,
+                    config.queue_size,
+                ),
+                Stage(
+                    "write", self._write_stage, config.write_workers, config.queue_size
+                ),
+            ],
+            on_error=self._stage_error,
+            on_cancel=self._stage_cancel,
+            cancel=cancel,
+            executor=executor,
+            budget=self.budget,
+            executor_threads=executor_threads,
+        )
+
+    def _outcome(self, job: TrackJob) -> TrackOutcome:
+        """Report entry for a finished track."""
+        return TrackOutcome(
+            status=job.status,
+            url=job.url,
+            artist=self.artist_name,
+            name=job.name,
+            number=job.number,
+            path=os.path.abspath(job.path),
+            artwork_url=self.artwork[job.index],
+            album=self.options.album,
+            error=job.error,
+            message=job.message,
+            bytes=job.bytes,
+            duration=round(time.monotonic() - job.started, 3) if job.started else 0,
+        )
+
+    def run(
+        self,
+        report: RunReport,
+        on_progress: Optional[Callable[[Progress], None]],
+        cancel: Optional[threading.Event],
+        executor: Optional[Executor],
+        executor_threads: Optional[int],
+    ) -> None:
+        tracks = self.catalog.tracks
+        total = len(tracks)
+        done = 0
+        pipeline: Optional[Pipeline] = None
+
+        def finish(job: TrackJob) -> None:
+            nonlocal done
+            done += 1
+            outcome = self._outcome(job)
+            report.add(outcome)
+            if on_progress is not None:
+                on_progress(
+                    Progress(
+                        outcome=outcome,
+                        done=done,
+                        total=total,
+                        queue_depths=pipeline.queue_depths() if pipeline else {},
+                        buffered_bytes=self.budget.in_use,
+                    )
+                )
+
+        self.index.ensure_dir()
+        # titles that slugify to the same name get numbered filenames
+        filenames = unique_filenames([track.name for track in tracks], ".mp3")
+        jobs = []
+        for i, track in enumerate(tracks):
+            filename = track.filename or filenames[i]
+            job = TrackJob(
+                index=i,
+                number=i + 1,
+                total=total,
+                name=track.name,
+                url=track.url,
+                path=f"{self.dir_path}/{filename}",
+            )
+            if filename in self.index and not self.options.overwrite:
+                job.status = "skipped"
+                job.message = f"{job.number} • {job.path} already exists, skipping..."
+                finish(job)
+                continue
+            jobs.append(job)
+
+        try:
+            if jobs:
+                pipeline = self._build_pipeline(cancel, executor, executor_threads)
+                try:
+                    for job in pipeline.run(jobs):
+                        # Drop the buffered audio before accepting more work
+                        self.budget.release(job.reserved, owner=job)
+                        job.content = None
+                        job.mp3 = None
+                        job.album_art = None
+                        finish(job)
+                finally:
+                    pipeline.close()
+        finally:
+            self.artwork_resolver.close()
+            self.index.save()
+
+
+def download(
+    catalog: Catalog,
+    options: DownloadOptions,
+    on_progress: Optional[Callable[[Progress], None]] = None,
+    cancel: Optional[threading.Event] = None,
+    executor: Optional[Executor] = None,
+    report: Optional[RunReport] = None,
+    executor_threads: Optional[int] = None,
+) -> RunReport:
+    """
+    Download every track in a catalog.
+
+    :param catalog: Catalog
+        tracks to download, from fetch_catalog() or built by hand
+    :param options: DownloadOptions
+        output folder, tagging and concurrency settings
+    :param on_progress: Optional[Callable[[Progress], None]]
+        called on the calling thread each time a track finishes or is skipped
+    :param cancel: Optional[threading.Event]
+        set it to stop starting new tracks; they are reported as cancelled
+    :param executor: Optional[Executor]
+        runs the pipeline workers and must be dedicated to this download
+        while it runs; a private thread pool is used if not given. Artwork
+        requests always run on a small pool of their own
+    :param report: Optional[RunReport]
+        report to add outcomes to, so several catalogs can share one
+    :param executor_threads: Optional[int]
+        threads of `executor` free for this download, required with it and
+        at least options.pipeline.total_workers
+    :return: RunReport
+        outcome of every track in the catalog
+    :raises ValueError:
+        if `executor` is given without enough `executor_threads`
+    """
+    check_executor(executor, executor_threads, options.pipeline.total_workers)
+    report = report if report is not None else RunReport()
+    _Download(catalog, options).run(
+        report, on_progress, cancel, executor, executor_threads
+    )
+    return report
@@ -0,0 +1,240 @@
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from io import BytesIO
+from typing import Any, Optional
+from urllib.request import Request, urlopen
+
+from PIL import Image as PILImage
+
+from beatstarsdownloader.logger import debug_logger
+
+# Seconds one cover request may take from start to end, connecting included
+ARTWORK_TIMEOUT = 5.0
+# Requests one race keeps in flight at once, and fallback candidates tried
+MAX_PARALLEL = 4
+MAX_CANDIDATES = 8
+# Most bytes returned by a single read, the deadline is checked between reads
+READ_CHUNK = 64 * 1024
+
+
+def _socket_of(response: Any) -> Optional[socket.socket]:
+    """The socket behind a urlopen response, which http.client doesn't expose."""
+    sock = getattr(getattr(getattr(response, "fp", None), "raw", None), "_sock", None)
+    return sock if isinstance(sock, socket.socket) else None
+
+
+class _Race:
+    """Shared state of the requests fetching one cover."""
+
+    def __init__(self) -> None:
+        self.won = threading.Event()
+        # deadline of every request that has started running, by URL
+        self.deadlines: dict[str, float] = {}
+        self._sockets: list[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def start(self, url: str, timeout: float) -> float:
+        """Record that a request started and return its deadline."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self.deadlines[url] = deadline
+        return deadline
+
+    def track(self, sock: Optional[socket.socket]) -> bool:
+        """Remember a request's socket, False if the race is already won."""
+        with self._lock:
+            if sock is not None:
+                self._sockets.append(sock)
+            return not self.won.is_set()
+
+    def finish(self) -> None:
+        """Mark the race as won and wake losers blocked on their sockets."""
+        with self._lock:
+            self.won.set()
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def wait_time(self, urls: list[str], poll: float) -> Optional[float]:
+        """
+        How long to wait for the requests fetching `urls`.
+
+        :return: Optional[float]
+            `poll` while some haven't started, the time until the last
+            deadline otherwise, or None once every deadline has passed
+        """
+        with self._lock:
+            if any(url not in self.deadlines for url in urls):
+                return poll
+            left = max(self.deadlines[url] for url in urls) - time.monotonic()
+        return left if left > 0 else None
+
+
+class ArtworkResolver:
+    """
+    Fetches cover art, racing fallback URLs when the primary one fails.
+
+    Every request must finish within `timeout` seconds of starting; each
+    read waits at most for the time left, so a server trickling bytes can't
+    stretch it. A race keeps at most `max_parallel` requests in flight on a
+    pool sized for `races` concurrent races, and a request queued behind
+    another track's race gets its full time once it runs. Once a request
+    returns a valid image the others are abandoned and their connections
+    shut down. URLs that failed are remembered and skipped for the rest of
+    the run. Call close() when done.
+    """
+
+    def __init__(
+        self,
+        timeout: float = ARTWORK_TIMEOUT,
+        max_parallel: int = MAX_PARALLEL,
+        max_candidates: int = MAX_CANDIDATES,
+        races: int = 1,
+    ):
+        self.timeout = timeout
+        self.max_parallel = max(1, max_parallel)
+        self.max_candidates = max(1, max_candidates)
+        self.races = max(1, races)
+        self._bad: set[str] = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def is_bad(self, url: str) -> bool:
+        with self._lock:
+            return url in self._bad
+
+    def close(self) -> None:
+        """Shut down the request pool without waiting for abandoned requests."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_parallel * self.races,
+                    thread_name_prefix="artwork",
+                )
+            return self._executor
+
+    def _fetch(self, url: str, race: _Race) -> Optional[bytes]:
+        """
+        Download one image, returning None and remembering the URL on failure.
+
+        :param url: str
+            artwork URL
+        :param race: _Race
+            race this request belongs to
+        :return: Optional[bytes]
+            image bytes if the URL returned a readable image in time
+        """
+        deadline = race.start(url, self.timeout)
+        if race.won.is_set():
+            return None
+        try:
+            chunks = []
+            with urlopen(
+                Request(url=url, headers={"User-Agent": "Mozilla/5.0"}),
+                timeout=self.timeout,
+            ) as response:
+                sock = _socket_of(response)
+                if not race.track(sock):
+                    return None
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"no image after {self.timeout}s")
+                    if race.won.is_set():
+                        return None
+                    if sock is not None:
+                        # urlopen's timeout bounds each read, not the total
+                        sock.settimeout(remaining)
+                    chunk = response.read1(READ_CHUNK)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+            data = b"".join(chunks)
+            PILImage.open(BytesIO(data)).verify()
+            return data
+        except Exception as e:
+            if race.won.is_set():
+                # lost the race, the URL itself may be fine
+                return None
+            debug_logger.debug_error(f"Artwork failed - URL: {url}", e)
+            with self._lock:
+                self._bad.add(url)
+            return None
+
+    def _race(self, urls: list[str]) -> Optional[bytes]:
+        """Fetch urls, `max_parallel` at a time, and return the first image."""
+        race = _Race()
+        pool = self._pool()
+        queue = iter(urls)
+        pending: dict[Future, str] = {}
+
+        def submit() -> None:
+            url = next(queue, None)
+            if url is not None:
+                pending[pool.submit(self._fetch, url, race)] = url
+
+        for _ in range(self.max_parallel):
+            submit()
+        try:
+            while pending:
+                timeout = race.wait_time(list(pending.values()), self.timeout)
+                if timeout is None:
+                    # every request is past its deadline, e.g. stuck in DNS
+                    return None
+                done, _ = wait(
+                    list(pending), timeout=timeout, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    del pending[future]
+                    data: Optional[bytes] = future.result()
+                    if data:
+                        race.finish()
+                        return data
+                    submit()
+            return None
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def resolve(self, artwork: list[str], index: int) -> Optional[bytes]:
+        """
+        Get the cover for a track, falling back to other tracks' artwork.
+
+        :param artwork: list[str]
+            artwork URLs of every track in the catalog
+        :param index: int
+            index of the track whose cover is wanted
+        :return: Optional[bytes]
+            image bytes, or None if no candidate worked
+        """
+        primary = artwork[index] if index < len(artwork) else ""
+        if primary and not self.is_bad(primary):
+            data = self._race([primary])
+            if data:
+                return data
+
+        candidates: list[str] = []
+        for url in artwork[index + 1 :] + artwork[:index]:
+            if (
+                url
+                and url != primary
+                and url not in candidates
+                and not self.is_bad(url)
+            ):
+                candidates.append(url)
+                if len(candidates) == self.max_candidates:
+                    break
+        if not candidates:
+            return None
+        return self._race(candidates)
@@ -0,0 +1,247 @@
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import validators  # type: ignore
+from bs4 import BeautifulSoup
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from selenium.webdriver.firefox.options import Options as FirefoxOptions
+
+import beatstarsdownloader.url_helpers as helpers
+from beatstarsdownloader.normalize import slugify
+from beatstarsdownloader.profiling import phase
+from beatstarsdownloader.report import TrackOutcome
+
+
+@dataclass
+class Track:
+    """A track listed on an artist page."""
+
+    name: str
+    url: str
+    artwork_url: str = ""
+    # Set when the filename is already known, e.g. when replaying a report
+    filename: Optional[str] = None
+
+
+@dataclass
+class Catalog:
+    """The tracks scraped from a BeatStars artist page."""
+
+    url: str
+    artist_name: str
+    tracks: list[Track] = field(default_factory=list)
+    browser: str = ""
+
+    @classmethod
+    def from_outcomes(cls, outcomes: list[TrackOutcome]) -> "Catalog":
+        """
+        Rebuild a catalog from run report entries, without scraping.
+
+        :param outcomes: list[TrackOutcome]
+            report entries for tracks by the same artist
+        :return: Catalog
+        """
+        return cls(
+            url="",
+            artist_name=outcomes[0].artist,
+            tracks=[
+                Track(
+                    name=outcome.name,
+                    url=outcome.url,
+                    artwork_url=outcome.artwork_url,
+                    filename=os.path.basename(outcome.path) or None,
+                )
+                for outcome in outcomes
+            ],
+        )
+
+
+def get_webdriver() -> webdriver.Remote:
+    """Get webdriver instance, trying browsers in order of preference."""
+    try:
+        firefox_options = FirefoxOptions()
+        firefox_options.add_argument("--headless")
+        firefox_options.set_preference("toolkit.telemetry.enabled", False)
+        firefox_options.set_preference("toolkit.telemetry.unified", False)
+        firefox_options.set_preference("toolkit.telemetry.archive.enabled", False)
+        firefox_options.set_preference(
+            "datareporting.healthreport.uploadEnabled", False
+        )
+        firefox_options.set_preference(
+            "datareporting.policy.dataSubmissionEnabled", False
+        )
+        firefox_options.set_preference("privacy.trackingprotection.enabled", True)
+        firefox_options.set_preference("privacy.donottrackheader.enabled", True)
+        return webdriver.Firefox(options=firefox_options)
+    except Exception:
+        pass
+
+    try:
+        chrome_options = ChromeOptions()
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+        chrome_options.add_argument("--disable-features=VizDisplayCompositor")
+        chrome_options.add_argument("--disable-logging")
+        chrome_options.add_argument("--disable-metrics")
+        chrome_options.add_argument("--disable-metrics-reporting")
+        chrome_options.add_argument("--disable-crash-reporter")
+        chrome_options.add_argument(
+            "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/91.0.4472.124 Safari/537.36"
+        )
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option("useAutomationExtension", False)
+        return webdriver.Chrome(options=chrome_options)
+    except Exception:
+        pass
+
+    raise Exception(
+        "No compatible browser found. Please install Chrome, Firefox, or Edge."
+    )
+
+
+def scroll_down(driver: webdriver.Remote) -> None:
+    """
+    Selenium method to scroll down to end of page to ensure page is loaded.
+
+    :param driver: webdriver
+        Selenium web driver
+    """
+    # Get scroll height.
+    last_height = driver.execute_script("return document.body.scrollHeight")
+    while True:
+        # Scroll down to the bottom.
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        # Wait to load the page.
+        time.sleep(3)
+        # Calculate new scroll height and compare with last scroll height.
+        new_height = driver.execute_script("return document.body.scrollHeight")
+        if new_height == last_height:
+            break
+        last_height = new_height
+
+
+def artist_url(url: str) -> str:
+    """
+    Turn an artist name into their /tracks url and check it is on BeatStars.
+
+    :param url: str
+        BeatStars URL or artist name
+    :return: str
+        BeatStars tracks URL
+    """
+    if not validators.url(url):
+        url = "https://www.beatstars.com/" + url + "/tracks"
+    if not helpers.is_bs_url(url):
+        raise ValueError("Doesn't look like a beatstars.com url...")
+    return url
+
+
+def get_artist_name(soup: BeautifulSoup) -> str:
+    """
+    Returns artist name from BeatStars artist page soup object.
+
+    :param soup: BeautifulSoup
+        soup object of artist page on BeatStars
+    :return: str
+        artist name
+    """
+    name_element = soup.find("span", {"class": "name ng-star-inserted"})
+    if name_element is None:
+        raise ValueError("Artist name not found")
+    return slugify(name_element.text.strip())
+
+
+def get_tracks(soup: BeautifulSoup) -> list[Track]:
+    """
+    Returns the tracks listed on a BeatStars artist page.
+
+    :param soup: BeautifulSoup
+        soup object of artist page on BeatStars
+    :return: list[Track]
+        tracks with names, stream urls and artwork urls
+    """
+    tracks = []
+    for track in soup.find_all("mp-card-figure-template", {"class": "track-template"}):
+        track_object = track.find(  # type: ignore
+            "a", {"class": "name ng-star-inserted"}  # type: ignore
+        )
+        if not (
+            track_object
+            and hasattr(track_object, "text")
+            and hasattr(track_object, "get")
+        ):
+            continue
+        href = track_object.get("href")  # type: ignore
+        if not href:
+            continue
+        artwork_url = ""
+        img_tag = track.find("img")  # type: ignore
+        if img_tag:
+            artwork_url = str(img_tag.get("src") or "")  # type: ignore
+        tracks.append(
+            Track(
+                name=slugify(track_object.text.strip()),
+                url=(
+                    f"https://main.v2.beatstars.com/stream?id="
+                    f"{str(href).lstrip('/TK')}"
+                    f"&return=audio"
+                ),
+                artwork_url=artwork_url,
+            )
+        )
+    return tracks
+
+
+def parse_catalog(url: str, page_source: str, browser: str = "") -> Catalog:
+    """
+    Build a catalog from the HTML of a BeatStars artist page.
+
+    :param url: str
+        BeatStars URL the page was loaded from
+    :param page_source: str
+        HTML of the fully scrolled page
+    :param browser: str
+        name of the browser that loaded the page
+    :return: Catalog
+    """
+    with phase("parse"):
+        soup = BeautifulSoup(page_source, "html.parser")
+    title_element = soup.find("span", {"class": "title"})
+    if title_element and title_element.text == "404":
+        raise ValueError(f"The url {url} returns 404...")
+    with phase("tracks"):
+        return Catalog(
+            url=url,
+            artist_name=get_artist_name(soup),
+            tracks=get_tracks(soup),
+            browser=browser,
+        )
+
+
+def fetch_catalog(url: str) -> Catalog:
+    """
+    Load a BeatStars artist page with Selenium and list its tracks.
+
+    :param url: str
+        BeatStars URL for artist page, or the artist name
+    :return: Catalog
+        artist name and tracks found on the page
+    """
+    url = artist_url(url)
+    with phase("selenium"):
+        driver = get_webdriver()
+        try:
+            driver.get(url)
+            scroll_down(driver)
+            page_source = driver.page_source
+        finally:
+            driver.quit()
+    with phase("catalog"):
+        return parse_catalog(url, page_source, driver.name)
@@ -1,35 +1,61 @@
+import logging
 import os
 from typing import Optional
 
 from halo import Halo  # type: ignore
 from simple_chalk import chalk  # type: ignore
 
+# Logger the download code reports errors to
+log = logging.getLogger("beatstarsdownloader")
+
+
+class HaloHandler(logging.Handler):
+    """Logging handler that prints records as persisted Halo spinner lines."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        text = self.format(record)
+        # Use Halo to create a consistent debug output style
+        with Halo(text=chalk.yellow(text), spinner="dots") as halo:
+            halo.stop_and_persist(
+                symbol=f'{chalk.yellow("🐛")}', text=chalk.yellow.dim(text)
+            )
+
 
 class DebugLogger:
-    """Debug logger that uses Halo spinners for consistent output styling."""
+    """
+    Debug logger for download errors.
+
+    Messages go to the `beatstarsdownloader` standard library logger, so the
+    library never prints on its own. The command line calls
+    enable_terminal_output() to show them with Halo styling.
+    """
 
     def __init__(self) -> None:
         self.debug_enabled = self._is_debug_enabled()
+        self._handler: Optional[HaloHandler] = None
 
     def _is_debug_enabled(self) -> bool:
         """Check if debug logging is enabled via environment variable."""
         debug_value = os.environ.get("BEATSTARS_DEBUG", "").lower()
         return debug_value in ("1", "true", "yes", "on")
 
+    def enable_terminal_output(self) -> None:
+        """Print debug messages to the terminal if BEATSTARS_DEBUG is set."""
+        if not self.debug_enabled or self._handler is not None:
+            return
+        self._handler = HaloHandler()
+        log.addHandler(self._handler)
+        log.setLevel(logging.DEBUG)
+
     def debug_error(self, message: str, error: Optional[Exception] = None) -> None:
-        """Log debug error message with Halo styling if debug is enabled."""
-        if not self.debug_enabled:
+        """Log a debug error message."""
+        if not log.isEnabledFor(logging.DEBUG):
             return
 
         error_text = f"DEBUG: {message}"
         if error:
             error_text += f" - {str(error)}"
-
-        # Use Halo to create a consistent debug output style
-        with Halo(text=chalk.yellow(error_text), spinner="dots") as halo:
-            halo.stop_and_persist(
-                symbol=f'{chalk.yellow("🐛")}', text=chalk.yellow.dim(error_text)
-            )
+        log.debug(error_text)
 
     def debug_track_download_error(
         self,
@@ -40,7 +66,7 @@ class DebugLogger:
         url: Optional[str] = None,
     ) -> None:
         """Log debug information for track download errors."""
-        if not self.debug_enabled:
+        if not log.isEnabledFor(logging.DEBUG):
             return
 
         error_details = [
@@ -52,15 +78,7 @@ class DebugLogger:
             error_details.append(f"URL: {url}")
 
         debug_message = " | ".join(error_details)
-
-        with Halo(
-            text=chalk.yellow(f"DEBUG: Track download error - {debug_message}"),
-            spinner="dots",
-        ) as halo:
-            halo.stop_and_persist(
-                symbol=f'{chalk.yellow.dim("🐛")}',
-                text=chalk.yellow.dim(f"DEBUG: Track download error - {debug_message}"),
-            )
+        log.debug(f"DEBUG: Track download error - {debug_message}")
 
 
 # Global debug logger instance
@@ -0,0 +1,72 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Compiled once at import instead of on every slugify call
+_INVALID_CHARS = re.compile(r"[^\w\s-]")
+_SEPARATORS = re.compile(r"[-\s]+")
+
+
+def slugify(value: str, allow_unicode: bool = False) -> str:
+    """
+    Taken from https://github.com/django/django/blob/master/django/utils
+    /text.py
+    Convert to ASCII if 'allow_unicode' is False. Convert spaces or repeated
+    dashes to single spaces. Remove characters that aren't alphanumerics,
+    underscores, or hyphens. Also strip leading and trailing dashes and
+    underscores.
+
+    Results are memoized, so repeated titles across a catalog are free.
+    """
+    return _slugify(str(value), allow_unicode)
+
+
+@lru_cache(maxsize=65536)
+def _slugify(value: str, allow_unicode: bool) -> str:
+    if allow_unicode:
+        value = unicodedata.normalize("NFKC", value)
+    elif not value.isascii():
+        # NFKD is a no-op on pure ASCII, so only decompose when needed
+        value = (
+            unicodedata.normalize("NFKD", value)
+            .encode("ascii", "ignore")
+            .decode("ascii")
+        )
+    value = _INVALID_CHARS.sub("", value)
+    return _SEPARATORS.sub(" ", value).strip("-_")
+
+
+def unique_filenames(names: list[str], extension: str = "") -> list[str]:
+    """
+    Build one filename per name, numbering any that would collide.
+
+    Collisions are compared case-insensitively so the result is also safe on
+    case-insensitive filesystems. Numbers are handed out from the end of the
+    list, which on a BeatStars page is the oldest upload: the oldest
+    occurrence keeps its plain name, newer ones become `name (2)`,
+    `name (3)` and so on. A new upload with a taken title therefore gets a
+    new filename instead of claiming the one already on disk.
+
+    :param names: list[str]
+        slugified track names, in catalog order (newest first)
+    :param extension: str
+        extension appended to every filename, e.g. ".mp3"
+    :return: list[str]
+        filenames in the same order as names
+    """
+    taken: set[str] = set()
+    # last number used per name, so repeated names don't rescan from 1
+    counters: dict[str, int] = {}
+    filenames = []
+    for name in reversed(names):
+        key = name.casefold()
+        n = counters.get(key, 1)
+        filename = f"{name}{extension}" if n == 1 else f"{name} ({n}){extension}"
+        while filename.casefold() in taken:
+            n += 1
+            filename = f"{name} ({n}){extension}"
+        counters[key] = n
+        taken.add(filename.casefold())
+        filenames.append(filename)
+    filenames.reverse()
+    return filenames
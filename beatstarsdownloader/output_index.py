@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+
+# Persisted index of files already saved in an artist folder
+INDEX_FILENAME = ".beatstarsdownloader-index.json"
+
+
+class OutputIndex:
+    """
+    In-memory index of the files already saved in an artist folder.
+
+    The folder is listed once up front instead of probing every track with
+    os.path.exists, which matters when the output lives on network storage.
+    With `trust=True` a previously persisted index is used as-is and the
+    folder is not touched at all.
+    """
+
+    def __init__(self, dir_path: str, trust: bool = False):
+        self.dir_path = dir_path
+        self.index_path = os.path.join(dir_path, INDEX_FILENAME)
+        self.dir_exists = False
+        self._names: set[str] = set()
+        self._lock = threading.Lock()
+        if not (trust and self._load()):
+            self._scan()
+
+    def _load(self) -> bool:
+        """
+        Load the persisted index.
+
+        :return: bool
+            True if a usable index file was found
+        """
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        files = data.get("files") if isinstance(data, dict) else None
+        if not isinstance(files, list):
+            return False
+        self._names = {str(name) for name in files}
+        self.dir_exists = True
+        return True
+
+    def _scan(self) -> None:
+        """List the folder once and remember every file name in it."""
+        try:
+            with os.scandir(self.dir_path) as entries:
+                self._names = {
+                    entry.name for entry in entries if entry.name != INDEX_FILENAME
+                }
+            self.dir_exists = True
+        except FileNotFoundError:
+            self._names = set()
+            self.dir_exists = False
+
+    def __contains__(self, filename: object) -> bool:
+        with self._lock:
+            return filename in self._names
+
+    def add(self, filename: str) -> None:
+        """Record a file that has just been written."""
+        with self._lock:
+            self._names.add(filename)
+
+    def ensure_dir(self) -> None:
+        """Create the folder unless the index already knows it exists."""
+        if not self.dir_exists:
+            os.makedirs(self.dir_path, exist_ok=True)
+            self.dir_exists = True
+
+    def save(self) -> None:
+        """Persist the index next to the tracks so `trust` runs can reuse it."""
+        self.ensure_dir()
+        with self._lock:
+            files = sorted(self._names)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"files": files}, f)
+        os.replace(tmp_path, self.index_path)
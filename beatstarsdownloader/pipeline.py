@@ -0,0 +1,289 @@
+import queue
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
+
+from beatstarsdownloader.profiling import phase, profiled
+
+# Sentinel put on a stage queue to stop one of its workers
+_STOP = object()
+
+
+@dataclass
+class PipelineConfig:
+    """Worker counts, queue depth and memory budget for the download pipeline."""
+
+    fetch_workers: int = 4
+    transcode_workers: int = 1
+    artwork_workers: int = 2
+    write_workers: int = 1
+    queue_size: int = 4
+    max_inflight_bytes: int = 128 * 1024 * 1024
+
+    @property
+    def total_workers(self) -> int:
+        """Threads the pipeline needs, one per stage worker."""
+        return sum(
+            max(1, workers)
+            for workers in (
+                self.fetch_workers,
+                self.transcode_workers,
+                self.artwork_workers,
+                self.write_workers,
+            )
+        )
+
+
+def check_executor(
+    executor: Optional[Executor], threads: Optional[int], workers: int
+) -> None:
+    """
+    Make sure a caller's executor can run `workers` long-lived workers at once.
+
+    Stage workers block on their queues until the pipeline closes, so a pool
+    with fewer threads would leave stages without a worker and deadlock. The
+    executor's size can't be read reliably, so the caller states how many
+    threads it dedicates to the pipeline.
+
+    :param executor: Optional[Executor]
+        executor given by the caller, nothing to check if None
+    :param threads: Optional[int]
+        threads of `executor` free for the pipeline's workers
+    :param workers: int
+        workers the pipeline starts
+    :raises ValueError:
+        if `threads` is missing or smaller than `workers`
+    """
+    if executor is None:
+        return
+    if threads is None:
+        raise ValueError("executor_threads is required when passing an executor")
+    if threads < workers:
+        raise ValueError(
+            f"executor has {threads} threads, the pipeline needs {workers}"
+        )
+
+
+class BudgetClosed(Exception):
+    """Raised by ByteBudget.acquire once the budget has been closed."""
+
+
+class ByteBudget:
+    """
+    Global budget of bytes that may be held in memory at once.
+
+    Requests larger than the whole budget are clamped to it. Reservations
+    made in steps, e.g. while reading a body of unknown size, pass an
+    `owner`: when the budget runs out, one owner that already holds bytes
+    takes the overdraft and may grow past the limit until it releases
+    everything, while the others wait. Partial holders therefore can't
+    block each other forever, and only one of them exceeds the limit at a
+    time.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_use = 0
+        self.closed = False
+        self._cond = threading.Condition()
+        # bytes held per owner, and the owner allowed past the limit
+        self._held: dict[int, int] = {}
+        self._overdraft: Optional[object] = None
+
+    def acquire(self, size: int, owner: Optional[object] = None) -> int:
+        """
+        Block until `size` bytes are available and reserve them.
+
+        :param size: int
+            number of bytes to reserve
+        :param owner: Optional[object]
+            holder of the reservation, for reservations made in steps
+        :return: int
+            number of bytes actually reserved, pass this to release()
+        :raises BudgetClosed:
+            if the budget is closed before the bytes become available
+        """
+        size = min(max(0, size), self.limit)
+        with self._cond:
+            while True:
+                if self.closed:
+                    raise BudgetClosed()
+                if self.in_use + size <= self.limit:
+                    break
+                if owner is not None:
+                    if self._overdraft is owner:
+                        break
+                    if self._overdraft is None and self._held.get(id(owner)):
+                        self._overdraft = owner
+                        break
+                self._cond.wait()
+            self.in_use += size
+            if owner is not None:
+                self._held[id(owner)] = self._held.get(id(owner), 0) + size
+        return size
+
+    def release(self, size: int, owner: Optional[object] = None) -> None:
+        """Return previously reserved bytes to the budget."""
+        size = max(0, size)
+        with self._cond:
+            self.in_use = max(0, self.in_use - size)
+            if owner is not None:
+                left = self._held.pop(id(owner), 0) - size
+                if left > 0:
+                    self._held[id(owner)] = left
+                elif self._overdraft is owner:
+                    self._overdraft = None
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Wake every waiting acquire() and make it raise BudgetClosed."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class Stage:
+    """
+    A named pipeline stage with its own bounded input queue and workers.
+
+    The handler receives an item and returns the name of the stage the item
+    should move to next, or None when the item is finished.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Optional[str]],
+        workers: int = 1,
+        queue_size: int = 4,
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+
+
+class Pipeline:
+    """
+    Runs items through stages connected by bounded queues.
+
+    A full downstream queue blocks the upstream workers, so fast stages can
+    never buffer more than `queue_size` items ahead of a slow one. Finished
+    items (and items whose handler raised) are collected on a results queue
+    that run() drains on the calling thread.
+
+    Workers run on `executor` if one is given, otherwise on a private thread
+    pool. The executor must be dedicated to the pipeline while it runs, with
+    `executor_threads` of at least one thread per stage worker: threads busy
+    with other work count against it and can deadlock the stages.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        on_error: Callable[[Any, Exception], None],
+        on_cancel: Callable[[Any], None],
+        cancel: Optional[threading.Event] = None,
+        executor: Optional[Executor] = None,
+        budget: Optional[ByteBudget] = None,
+        executor_threads: Optional[int] = None,
+    ):
+        workers = sum(stage.workers for stage in stages)
+        check_executor(executor, executor_threads, workers)
+        self.stages = {stage.name: stage for stage in stages}
+        self.budget = budget
+        self.first = stages[0].name
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.cancel = cancel or threading.Event()
+        self._stopping = threading.Event()
+        self._results: "queue.Queue[Any]" = queue.Queue()
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="beatstars",
+        )
+        self._futures: dict[str, list[Future]] = {
+            stage.name: [
+                self._executor.submit(profiled(self._work), stage)
+                for _ in range(stage.workers)
+            ]
+            for stage in stages
+        }
+
+    def _work(self, stage: Stage) -> None:
+        while True:
+            item = stage.queue.get()
+            if item is _STOP:
+                return
+            if self.cancel.is_set() or self._stopping.is_set():
+                self.on_cancel(item)
+                next_stage = None
+            else:
+                try:
+                    with phase(stage.name):
+                        next_stage = stage.handler(item)
+                except BudgetClosed:
+                    self.on_cancel(item)
+                    next_stage = None
+                except Exception as e:
+                    self.on_error(item, e)
+                    next_stage = None
+            if next_stage is None:
+                self._results.put(item)
+            else:
+                self.stages[next_stage].queue.put(item)
+
+    def run(self, items: list[Any]) -> Iterator[Any]:
+        """
+        Feed items into the first stage and yield them as they finish.
+
+        Items are submitted from the calling thread only while the first
+        queue has room. Once `cancel` is set, items not yet submitted are
+        yielded straight away and in-flight items drain without more work.
+
+        :param items: list[Any]
+            items to process
+        :return: Iterator[Any]
+            finished items, in completion order
+        """
+        first = self.stages[self.first].queue
+        pending = iter(items)
+        item = next(pending, _STOP)
+        remaining = len(items)
+        while remaining:
+            while item is not _STOP and not self.cancel.is_set():
+                try:
+                    first.put_nowait(item)
+                except queue.Full:
+                    break
+                item = next(pending, _STOP)
+            if self.cancel.is_set() and item is not _STOP:
+                self.on_cancel(item)
+                self._results.put(item)
+                item = next(pending, _STOP)
+            try:
+                finished = self._results.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            remaining -= 1
+            yield finished
+
+    def queue_depths(self) -> dict[str, int]:
+        """Number of items waiting in front of each stage."""
+        return {name: stage.queue.qsize() for name, stage in self.stages.items()}
+
+    def close(self) -> None:
+        """Stop all workers, cancelling whatever has not finished yet."""
+        self._stopping.set()
+        # Workers waiting for memory would otherwise never see the stop
+        if self.budget is not None:
+            self.budget.close()
+        # Stop stages in order so nothing is handed to an already stopped stage
+        for name, stage in self.stages.items():
+            for _ in range(stage.workers):
+                stage.queue.put(_STOP)
+            wait(self._futures[name])
+        if self._own_executor:
+            self._executor.shutdown()
@@ -0,0 +1,203 @@
+"""
+Profiling hooks for finding where a slow run spends its time.
+
+    with Profiler("profiles/run") as profiler:
+        ...
+    # writes profiles/run.pstats and profiles/run.collapsed
+
+`.pstats` files open with `python -m pstats` or snakeviz. `.collapsed` files
+hold one `frame;frame;frame count` line per sampled stack, the input format of
+flamegraph.pl and speedscope. Code marks its major phases with `phase()`,
+which show up as `[name]` frames at the root of every sampled stack.
+"""
+
+import cProfile
+import datetime
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from beatstarsdownloader.report import METADATA_DIR
+
+T = TypeVar("T")
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+# The profiler of the current run, if any
+_active: Optional["Profiler"] = None
+
+
+class Profiler:
+    """
+    Combines cProfile with a sampling profiler covering every thread.
+
+    cProfile gives exact call counts for the threads it is enabled on; the
+    sampler walks all thread stacks every `interval` seconds so pipeline
+    workers and blocking I/O show up in the flame graph too.
+    """
+
+    def __init__(self, prefix: str, interval: float = SAMPLE_INTERVAL):
+        self.prefix = prefix
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self.phase_times: dict[str, float] = defaultdict(float)
+        self._phases: dict[int, list[str]] = {}
+        self._profiles: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._sample, name="profiler", daemon=True
+        )
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        global _active
+        _active = self
+        self._enable(cProfile.Profile())
+        self._sampler.start()
+
+    def stop(self) -> None:
+        """Stop profiling and write the .pstats and .collapsed files."""
+        global _active
+        for profile in self._profiles:
+            profile.disable()
+        self._stop.set()
+        self._sampler.join()
+        _active = None
+        directory = os.path.dirname(self.prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._write_pstats(self.pstats_path)
+        with open(self.collapsed_path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    @property
+    def pstats_path(self) -> str:
+        return f"{self.prefix}.pstats"
+
+    @property
+    def collapsed_path(self) -> str:
+        return f"{self.prefix}.collapsed"
+
+    def _enable(self, profile: cProfile.Profile) -> bool:
+        """
+        Enable a cProfile profiler on the current thread.
+
+        :return: bool
+            False if another profiler is already active, which newer Pythons
+            allow only once per process; the sampler still covers the thread
+        """
+        try:
+            profile.enable()
+        except ValueError:
+            return False
+        with self._lock:
+            self._profiles.append(profile)
+        return True
+
+    def _write_pstats(self, path: str) -> None:
+        with self._lock:
+            profiles = list(self._profiles)
+        stats: Optional[pstats.Stats] = None
+        for profile in profiles:
+            profile.create_stats()
+            if not profile.stats:  # type: ignore
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats is None:
+            # nothing ran under cProfile, still leave a loadable file
+            empty = cProfile.Profile()
+            empty.enable()
+            empty.disable()
+            stats = pstats.Stats(empty)
+        stats.dump_stats(path)
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                current: Any = frame
+                while current is not None:
+                    code = current.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    current = current.f_back
+                stack.reverse()
+                phases = [f"[{name}]" for name in self._phases.get(ident, [])]
+                self.samples[";".join(phases + stack)] += 1
+
+    def _add_phase_time(self, name: str, elapsed: float) -> None:
+        with self._lock:
+            self.phase_times[name] += elapsed
+
+
+def default_profile_prefix(output_dir: str) -> str:
+    """Timestamped profile path prefix under the output directory's metadata folder."""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    return f"{output_dir}/{METADATA_DIR}/profiles/profile-{timestamp}"
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Mark a phase of a run, e.g. scraping or tagging.
+
+    Costs nothing when no Profiler is running. Nested phases are recorded as
+    `outer/inner` in Profiler.phase_times.
+    """
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    stack = profiler._phases.setdefault(threading.get_ident(), [])
+    stack.append(name)
+    key = "/".join(stack)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stack.pop()
+        profiler._add_phase_time(key, time.perf_counter() - start)
+
+
+def profiled(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Run `func` under its own cProfile profiler when a Profiler is active.
+
+    Used for worker threads, which the Profiler's own cProfile instance does
+    not see.
+    """
+    profiler = _active
+    if profiler is None:
+        return func
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        profile = cProfile.Profile()
+        enabled = profiler._enable(profile)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if enabled:
+                profile.disable()
+
+    return wrapper
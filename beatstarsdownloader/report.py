@@ -0,0 +1,121 @@
+import datetime
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Optional
+
+REPORT_VERSION = 1
+
+# Folder under the output directory for reports and profiles, dotted so it
+# can't clash with an artist folder
+METADATA_DIR = ".beatstarsdownloader"
+
+
+@dataclass
+class TrackOutcome:
+    """What happened to one track (or one artist page) during a run."""
+
+    status: str
+    url: str
+    artist: str = ""
+    name: str = ""
+    number: int = 0
+    path: str = ""
+    artwork_url: str = ""
+    album: Optional[str] = None
+    error: Optional[str] = None
+    message: str = ""
+    bytes: int = 0
+    duration: float = 0.0
+    kind: str = "track"
+
+
+@dataclass
+class RunReport:
+    """
+    Machine-readable record of a run, written as JSON.
+
+    Failed entries can be fed back in with `--replay` to re-attempt only
+    those tracks without scraping the artist pages again.
+    """
+
+    tracks: list[TrackOutcome] = field(default_factory=list)
+    started: str = field(
+        default_factory=lambda: datetime.datetime.now().isoformat(timespec="seconds")
+    )
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def add(self, outcome: TrackOutcome) -> None:
+        with self._lock:
+            self.tracks.append(outcome)
+
+    def add_page_failure(self, url: str, error: Exception) -> None:
+        """Record an artist page that could not be scraped at all."""
+        self.add(
+            TrackOutcome(
+                status="failed",
+                url=url,
+                error=type(error).__name__,
+                message=str(error),
+                kind="page",
+            )
+        )
+
+    def failed(self) -> list[TrackOutcome]:
+        return [outcome for outcome in self.tracks if outcome.status == "failed"]
+
+    def summary(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for outcome in self.tracks:
+            counts[outcome.status] = counts.get(outcome.status, 0) + 1
+        return counts
+
+    def save(self, path: str) -> None:
+        """
+        Write the report as JSON, creating parent folders as needed.
+
+        :param path: str
+            file path to write the report to
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data: dict[str, Any] = {
+                "version": REPORT_VERSION,
+                "started": self.started,
+                "finished": datetime.datetime.now().isoformat(timespec="seconds"),
+                "summary": self.summary(),
+                "tracks": [asdict(outcome) for outcome in self.tracks],
+            }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "RunReport":
+        """
+        Read a report written by save().
+
+        :param path: str
+            path of the JSON report
+        :return: RunReport
+        """
+        with open(path) as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get("version") != REPORT_VERSION:
+            raise ValueError(f"{path} is not a beatstarsdownloader report")
+        known = {f.name for f in fields(TrackOutcome)}
+        tracks = [
+            TrackOutcome(**{k: v for k, v in track.items() if k in known})
+            for track in data.get("tracks", [])
+        ]
+        return cls(tracks=tracks, started=data.get("started", ""))
+
+
+def default_report_path(output_dir: str) -> str:
+    """Timestamped report path under the output directory's metadata folder."""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    return f"{output_dir}/{METADATA_DIR}/reports/report-{timestamp}.json"
@@ -0,0 +1,122 @@
+from typing import Optional
+
+import filetype  # type: ignore
+
+# How much of the body to read before deciding what to do with a track
+SNIFF_SIZE = 4096
+
+# Handlers chosen by sniff_audio
+PASS_THROUGH = "mp3"
+TRANSCODE = "transcode"
+REJECT = "reject"
+
+# Content types that are never audio, e.g. an HTML error page
+_NON_AUDIO_TYPES = ("text/", "application/json", "application/xml")
+# Kinds of file filetype can detect that may carry an audio stream
+_AUDIO_KINDS = ("audio", "video")
+# How text bodies served in place of audio start, lowercased
+_TEXT_SIGNATURES = (b"<!doctype", b"<html", b"<?xml", b"{", b"[")
+
+
+def _syncsafe(data: bytes) -> int:
+    """Decode a 4 byte ID3v2 syncsafe integer."""
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def is_mpeg_frame(head: bytes, offset: int = 0) -> bool:
+    """
+    Check for a valid MPEG audio frame header at `offset`.
+
+    Besides the 11 bit frame sync, the reserved version, layer, bitrate and
+    sample rate values are rejected so random 0xFF bytes don't match.
+    """
+    if len(head) < offset + 4:
+        return False
+    b1, b2, b3 = head[offset + 1], head[offset + 2], head[offset + 3]
+    if head[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return False
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate = (b2 >> 4) & 0x0F
+    sample_rate = (b2 >> 2) & 0x03
+    emphasis = b3 & 0x03
+    return (
+        version != 0x01
+        and layer != 0x00
+        and bitrate != 0x0F
+        and sample_rate != 0x03
+        and emphasis != 0x02
+    )
+
+
+def find_mpeg_frame(head: bytes, start: int = 0) -> int:
+    """Offset of the first valid MPEG frame header at or after `start`, or -1."""
+    offset = head.find(b"\xff", start)
+    while offset != -1:
+        if is_mpeg_frame(head, offset):
+            return offset
+        offset = head.find(b"\xff", offset + 1)
+    return -1
+
+
+def is_mp3(head: bytes) -> bool:
+    """
+    Check whether the start of a body looks like an mp3 file.
+
+    The first frame may follow an ID3v2 tag (and its footer) or padding, so
+    `head` is scanned for it rather than only checked at the start.
+    """
+    start = 0
+    if head[:3] == b"ID3" and len(head) >= 10:
+        start = 10 + _syncsafe(head[6:10])
+        if head[5] & 0x10:
+            # ID3v2.4 footer
+            start += 10
+        if start + 4 > len(head):
+            # the tag fills `head`, the frames can't be checked yet
+            return True
+    return find_mpeg_frame(head, start) != -1
+
+
+def is_text(head: bytes) -> bool:
+    """Check whether a body starts like an HTML, XML or JSON document."""
+    return head.lstrip()[:16].lower().startswith(_TEXT_SIGNATURES)
+
+
+def sniff_audio(head: bytes, content_type: Optional[str] = None) -> tuple[str, str]:
+    """
+    Decide how to handle a track from the first few KB of its body.
+
+    Magic bytes recognised by filetype decide first, the scan for MPEG
+    frames only confirms mp3 heads or classifies bodies filetype doesn't
+    know. Only bodies the Content-Type or magic bytes identify as something
+    other than audio are rejected. Anything unrecognised goes to
+    PASS_THROUGH, where mutagen gets to read it and ffmpeg is the fallback.
+
+    :param head: bytes
+        first SNIFF_SIZE bytes of the response body
+    :param content_type: Optional[str]
+        Content-Type header of the response, if any
+    :return: tuple[str, str]
+        one of PASS_THROUGH, TRANSCODE or REJECT and a short description of
+        what was detected
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type.startswith(_NON_AUDIO_TYPES):
+        return REJECT, f"{content_type} response"
+    if not head:
+        return REJECT, "empty response"
+    mime = filetype.guess_mime(head)
+    if mime and mime.split("/")[0] not in _AUDIO_KINDS:
+        return REJECT, mime
+    if mime and mime != "audio/mpeg":
+        # e.g. WAV or FLAC, whose samples can look like MPEG frame syncs
+        return TRANSCODE, mime
+    if is_mp3(head):
+        return PASS_THROUGH, "audio/mpeg"
+    if mime:
+        # an ID3 tag that isn't followed by MPEG frames
+        return TRANSCODE, mime
+    if is_text(head):
+        return REJECT, "text response"
+    return PASS_THROUGH, content_type or "unknown content"
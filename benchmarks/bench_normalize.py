@@ -0,0 +1,113 @@
+"""
+Micro-benchmark for track title normalization over a 100k-title corpus.
+
+Compares the original per-call-compiled slugify against
+beatstarsdownloader.normalize, and times collision-aware filename generation.
+
+Run with:
+    poetry run python benchmarks/bench_normalize.py
+"""
+
+import random
+import re
+import time
+import unicodedata
+from typing import Callable
+
+from beatstarsdownloader.normalize import _slugify, slugify, unique_filenames
+
+CORPUS_SIZE = 100_000
+
+WORDS = [
+    "dark",
+    "trap",
+    "beat",
+    "Drake",
+    "Type",
+    "Beat",
+    "808",
+    "melodic",
+    "Rosé",
+    "Señorita",
+    "Ünder",
+    "night",
+    "[FREE]",
+    "(prod. lovbug)",
+    "-",
+    "|",
+    "lo-fi",
+    "café",
+    "wavy",
+    "2024",
+]
+
+
+def reference_slugify(value: str, allow_unicode: bool = False) -> str:
+    """slugify as it was before normalize.py, for comparison."""
+    value = str(value)
+    if allow_unicode:
+        value = unicodedata.normalize("NFKC", value)
+    else:
+        value = (
+            unicodedata.normalize("NFKD", value)
+            .encode("ascii", "ignore")
+            .decode("ascii")
+        )
+    value = re.sub(r"[^\w\s-]", "", value)
+    return re.sub(r"[-\s]+", " ", value).strip("-_")
+
+
+def build_corpus(size: int, seed: int = 0) -> list[str]:
+    """Random titles, with repeats like a real multi-artist catalog has."""
+    rng = random.Random(seed)
+    unique = [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 7)))
+        for _ in range(size // 4)
+    ]
+    return [rng.choice(unique) for _ in range(size)]
+
+
+def build_unique_corpus(size: int, seed: int = 0) -> list[str]:
+    """Distinct titles, so every slugify call misses the cache."""
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 7))) + f" {i}"
+        for i in range(size)
+    ]
+
+
+def bench(label: str, func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed * 1000:9.1f} ms")
+    return elapsed
+
+
+def main() -> None:
+    corpus = build_corpus(CORPUS_SIZE)
+    unique = build_unique_corpus(CORPUS_SIZE)
+    assert [reference_slugify(t) for t in corpus[:1000]] == [
+        slugify(t) for t in corpus[:1000]
+    ]
+
+    # every title distinct: no cache hits, only the faster implementation
+    print(f"{CORPUS_SIZE} titles, all unique")
+    _slugify.cache_clear()
+    before = bench("reference slugify", lambda: [reference_slugify(t) for t in unique])
+    cold = bench("normalize.slugify (cold cache)", lambda: [slugify(t) for t in unique])
+    print(f"speedup (cold): {before / cold:.1f}x")
+
+    # repeated titles, as in a real catalog
+    print(f"{CORPUS_SIZE} titles, {len(set(corpus))} unique")
+    _slugify.cache_clear()
+    before = bench("reference slugify", lambda: [reference_slugify(t) for t in corpus])
+    repeat = bench("normalize.slugify", lambda: [slugify(t) for t in corpus])
+    bench("normalize.slugify (warm cache)", lambda: [slugify(t) for t in corpus])
+    slugs = [slugify(t) for t in corpus]
+    bench("unique_filenames", lambda: unique_filenames(slugs, ".mp3"))
+    print(f"speedup (repeated titles): {before / repeat:.1f}x")
+
+
+if __name__ == "__main__":
+    main()